@@ -7,6 +7,38 @@ import unicodedata
 from typing import List
 
 
+# Common bullet symbols normalized to a standard dash
+BULLET_SYMBOLS = [
+    '•', '●', '○', '◦', '▪', '▫', '■', '□',
+    '◆', '◇', '★', '☆', '►', '▸', '⦿', '⦾',
+    '➢', '➤', '→', '⇒', '✓', '✔', '–', '—'
+]
+
+# Single-character replacements for problematic unicode, applied in one
+# str.translate pass
+UNICODE_REPLACEMENTS = {
+    '\u200b': '',  # Zero-width space
+    '\u200c': '',  # Zero-width non-joiner
+    '\u200d': '',  # Zero-width joiner
+    '\ufeff': '',  # Zero-width no-break space (BOM)
+    '\xa0': ' ',   # Non-breaking space
+    '\u2019': "'",  # Right single quotation mark
+    '\u2018': "'",  # Left single quotation mark
+    '\u201c': '"',  # Left double quotation mark
+    '\u201d': '"',  # Right double quotation mark
+    '\u2013': '-',  # En dash
+    '\u2014': '-',  # Em dash
+}
+
+# Compiled once at import time
+_UNICODE_TABLE = str.maketrans(UNICODE_REPLACEMENTS)
+_BULLET_CLASS = '[' + ''.join(re.escape(symbol) for symbol in BULLET_SYMBOLS) + ']'
+_BULLET_LINE_START_RE = re.compile(f'^{_BULLET_CLASS}\\s*', flags=re.MULTILINE)
+_BULLET_INLINE_RE = re.compile(f'\\s{_BULLET_CLASS}\\s+')
+_MULTI_NEWLINE_RE = re.compile(r'\n{3,}')
+_MULTI_SPACE_RE = re.compile(r' {2,}')
+
+
 def remove_duplicate_newlines(text: str) -> str:
     """
     Remove excessive newlines while preserving paragraph structure.
@@ -18,8 +50,7 @@ def remove_duplicate_newlines(text: str) -> str:
         Text with normalized newlines (max 2 consecutive)
     """
     # Replace 3+ newlines with 2
-    text = re.sub(r'\n{3,}', '\n\n', text)
-    return text
+    return _MULTI_NEWLINE_RE.sub('\n\n', text)
 
 
 def normalize_bullet_symbols(text: str) -> str:
@@ -32,19 +63,13 @@ def normalize_bullet_symbols(text: str) -> str:
     Returns:
         Text with normalized bullet points
     """
-    # Common bullet symbols
-    bullet_symbols = [
-        '•', '●', '○', '◦', '▪', '▫', '■', '□',
-        '◆', '◇', '★', '☆', '►', '▸', '⦿', '⦾',
-        '➢', '➤', '→', '⇒', '✓', '✔', '–', '—'
-    ]
-
-    for symbol in bullet_symbols:
-        # Replace bullet at start of line
-        text = re.sub(f'^{re.escape(symbol)}\\s*', '- ', text, flags=re.MULTILINE)
-        # Replace bullet after whitespace
-        text = re.sub(f'\\s{re.escape(symbol)}\\s+', ' - ', text)
-
+    # Replace bullet at start of line
+    text = _BULLET_LINE_START_RE.sub('- ', text)
+    # Replace bullet after whitespace; repeat because a match consumes the
+    # whitespace that a directly following bullet needs
+    replaced = 1
+    while replaced:
+        text, replaced = _BULLET_INLINE_RE.subn(' - ', text)
     return text
 
 
@@ -102,45 +127,32 @@ def flatten_table_text(text: str) -> str:
     # Replace tab characters with spaces
     text = text.replace('\t', ' ')
 
-    # Replace multiple spaces with single space (but preserve line breaks)
-    lines = text.split('\n')
-    cleaned_lines = [re.sub(r' {2,}', ' ', line) for line in lines]
-
-    return '\n'.join(cleaned_lines)
+    # Replace multiple spaces with single space (the pattern never spans line breaks)
+    return _MULTI_SPACE_RE.sub(' ', text)
 
 
 def strip_weird_unicode(text: str) -> str:
     """
     Remove or normalize problematic unicode characters.
 
+    Text is NFKC-normalized, so compatibility forms such as full-width
+    characters collapse to their plain equivalents (e.g. "C＋＋" -> "C++")
+    before reaching the LLM and the embedding model.
+
     Args:
         text: Input text with potential unicode issues
 
     Returns:
         Text with normalized unicode characters
     """
-    # Normalize unicode to composed form (NFC)
-    text = unicodedata.normalize('NFC', text)
-
-    # Replace common problematic characters
-    replacements = {
-        '\u200b': '',  # Zero-width space
-        '\u200c': '',  # Zero-width non-joiner
-        '\u200d': '',  # Zero-width joiner
-        '\ufeff': '',  # Zero-width no-break space (BOM)
-        '\xa0': ' ',   # Non-breaking space
-        '\u2019': "'",  # Right single quotation mark
-        '\u2018': "'",  # Left single quotation mark
-        '\u201c': '"',  # Left double quotation mark
-        '\u201d': '"',  # Right double quotation mark
-        '\u2013': '-',  # En dash
-        '\u2014': '-',  # Em dash
-    }
-
-    for old, new in replacements.items():
-        text = text.replace(old, new)
-
-    # Remove any remaining control characters except newlines and tabs
+    # Normalize unicode to compatibility composed form (NFKC)
+    text = unicodedata.normalize('NFKC', text)
+
+    # Replace common problematic characters in a single pass
+    text = text.translate(_UNICODE_TABLE)
+
+    # Remove any remaining control/format characters (e.g. soft hyphen)
+    # except newlines and tabs
     text = ''.join(char for char in text if unicodedata.category(char)[0] != 'C' or char in '\n\t\r')
 
     return text
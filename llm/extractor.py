@@ -7,6 +7,7 @@ import logging
 import time
 import re
 from typing import Optional, Dict, Any
+import orjson
 import requests
 
 from models.schema import ExtractedFeatures
@@ -177,30 +178,40 @@ class OllamaExtractor:
         Returns:
             Parsed JSON dict or None if parsing fails
         """
-        # Try to extract JSON from markdown code blocks if present
-        if "```json" in response:
-            try:
-                json_start = response.index("```json") + 7
-                json_end = response.index("```", json_start)
-                response = response[json_start:json_end].strip()
-            except ValueError:
-                pass
-        elif "```" in response:
-            try:
-                json_start = response.index("```") + 3
-                json_end = response.index("```", json_start)
-                response = response[json_start:json_end].strip()
-            except ValueError:
-                pass
-
-        # Clean common issues
-        response = response.strip()
+        # Fast path: the response is already clean JSON
+        try:
+            data = orjson.loads(response)
+            if isinstance(data, dict):
+                return data
+        except orjson.JSONDecodeError:
+            pass
+
+        # Prefer the body of a markdown code block so braces in prose are ignored
+        fence = response.find("```")
+        if fence != -1:
+            block_start = fence + 3
+            if response.startswith("json", block_start):
+                block_start += 4
+            block_end = response.find("```", block_start)
+            if block_end != -1:
+                block = response[block_start:block_end].strip()
+                try:
+                    data = orjson.loads(block)
+                    if isinstance(data, dict):
+                        return data
+                except orjson.JSONDecodeError:
+                    pass
+
+        # Last resort: parse the outermost {...} span of the whole response
+        start = response.find("{")
+        end = response.rfind("}")
+        if start == -1 or end <= start:
+            logger.warning("JSON parsing failed: no JSON object found in response")
+            return None
 
-        # Try to parse
         try:
-            data = json.loads(response)
-            return data
-        except json.JSONDecodeError as e:
+            return orjson.loads(response[start:end + 1])
+        except orjson.JSONDecodeError as e:
             logger.warning(f"JSON parsing failed: {e}")
             return None
 
@@ -428,12 +439,12 @@ class OllamaExtractor:
 
         # Retry loop for the single extraction pass
         for attempt in range(1, self.max_retries + 1):
-            logger.info(f"Extraction attempt {attempt}/{self.max_retries}")
+            logger.info("Extraction attempt %d/%d", attempt, self.max_retries)
 
             response = self._call_ollama(prompt)
 
             if not response:
-                logger.warning(f"No response from LLM on attempt {attempt}")
+                logger.warning("No response from LLM on attempt %d", attempt)
                 time.sleep(1)
                 continue
 
@@ -455,7 +466,7 @@ class OllamaExtractor:
                     logger.info("Successfully extracted and validated features.")
                     return features
                 except Exception as e:
-                    logger.error(f"Data validation failed: {e}")
+                    logger.error("Data validation failed: %s", e)
                     # Continue to retry if validation fails
 
             if attempt < self.max_retries:
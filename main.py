@@ -24,6 +24,11 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Project layout, resolved once at import time
+_BASE_DIR = Path(__file__).resolve().parent
+_OUTPUT_DIR = _BASE_DIR / "output"
+_SAMPLE_DIR = _BASE_DIR / "sample-data"
+
 
 def ensure_nltk_data():
     """
@@ -43,9 +48,9 @@ def ensure_nltk_data():
             # Check if the package is available in the default download location
             nltk.data.find(f'tokenizers/{package}')
         except LookupError:
-            logger.info(f"NLTK package '{package}' not found. Downloading...")
+            logger.info("NLTK package '%s' not found. Downloading...", package)
             nltk.download(package)
-            logger.info(f"Finished downloading '{package}'.")
+            logger.info("Finished downloading '%s'.", package)
 
 
 class FeatureExtractionPipeline:
@@ -152,7 +157,7 @@ class FeatureExtractionPipeline:
             logger.warning(f"No valid .docx files found in {input_dir}")
             return outputs
 
-        for doc in sorted(docx_files):
+        for doc in docx_files:
             try:
                 stem = doc.stem.replace(" ", "_")
                 # Create a friendly output name
@@ -165,7 +170,7 @@ class FeatureExtractionPipeline:
                     out_name = f"{stem}.json"
 
                 out_file = out_path / out_name
-                logger.info(f"\nProcessing: {doc} -> {out_file}")
+                logger.info("\nProcessing: %s -> %s", doc, out_file)
                 result = self.process_file_to_json(str(doc), str(out_file))
                 outputs.append(out_file)
 
@@ -176,10 +181,12 @@ class FeatureExtractionPipeline:
                 # print(json.dumps(result, indent=2, ensure_ascii=False))
                 print("="*60)
             except Exception as e:
-                logger.error(f"Failed to process file {doc.name}: {e}")
+                logger.error("Failed to process file %s: %s", doc.name, e)
                 # Continue to the next file
                 continue
 
+        # Files are processed in glob order; sort once here for reproducible results
+        outputs.sort()
         return outputs
 
 
@@ -199,11 +206,11 @@ def main():
 
     try:
         pipeline = FeatureExtractionPipeline(model=model)
-        output_dir = Path(__file__).parent / "output"
+        output_dir = _OUTPUT_DIR
 
         if len(sys.argv) < 2:
             # Auto process all files from sample-data
-            sample_dir = str(Path(__file__).parent / "sample-data")
+            sample_dir = str(_SAMPLE_DIR)
             logger.info(f"No input arguments provided. Processing all .docx in: {sample_dir}")
             extracted_result = pipeline.process_directory(sample_dir, str(output_dir))
             print(f"\nProcessed {len(extracted_result)} files. Outputs saved to: {output_dir}")
@@ -24,4 +24,5 @@ class ExtractedFeatures(BaseModel):
     @classmethod
     def from_dict(cls, data: dict) -> "ExtractedFeatures":
         """Create instance from dictionary."""
-        return cls(**data)
+        # Validate the mapping directly in pydantic-core, no kwargs unpacking
+        return cls.model_validate(data)
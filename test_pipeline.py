@@ -42,6 +42,7 @@ def test_text_cleaning():
     text = "Hello\u200bWorld\xa0Test"
     result = strip_weird_unicode(text)
     assert "\u200b" not in result
+    assert strip_weird_unicode("C\uff0b\uff0b") == "C++"
     print("✓ strip_weird_unicode works")
 
     # Test complete cleaning
@@ -151,6 +152,16 @@ def test_json_validation():
     assert result is not None
     print("✓ Markdown JSON extraction works")
 
+    # Braces in prose around a fenced block must not widen the JSON span
+    trailing_prose = '```json\n{"a": 1}\n```\nNote: fields in {braces} are optional.'
+    assert extractor._parse_json_response(trailing_prose) == {"a": 1}
+    leading_prose = 'Here is the output {as requested}:\n```json\n{"a": 1}\n```'
+    assert extractor._parse_json_response(leading_prose) == {"a": 1}
+    # A non-JSON code block must not hide JSON elsewhere in the response
+    other_block = 'Result: {"a": 1}\n```bash\ncurl localhost\n```'
+    assert extractor._parse_json_response(other_block) == {"a": 1}
+    print("✓ Markdown JSON surrounded by braced prose works")
+
     # Test validation and cleaning
     data = {
         "summary": "Test",
@@ -190,6 +201,345 @@ def test_integration():
     return True
 
 
+def _fake_embeddings(texts, dim=32):
+    """Deterministic unit vectors standing in for the embedding model."""
+    import hashlib
+    import numpy as np
+
+    vectors = np.stack([
+        np.frombuffer(hashlib.sha256(text.encode("utf-8")).digest(), dtype=np.uint8)[:dim]
+        for text in texts
+    ]).astype(np.float32) - 127.5
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_vector_cache():
+    """Test that unchanged inputs reuse stored vectors."""
+    print("\n" + "="*60)
+    print("TEST 6: Vector Cache")
+    print("="*60)
+
+    import json
+    import os
+    import tempfile
+    import vector_embedding_conversion_pipeline as pipeline_module
+    from vector_embedding_conversion_pipeline import VectorEmbeddingConversionPipeline
+
+    encode_calls = []
+
+    def fake_encode_unique(texts):
+        encode_calls.append(list(texts))
+        return _fake_embeddings(texts)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        input_dir = os.path.join(tmp_dir, "input")
+        os.makedirs(input_dir)
+        documents = {
+            "jd.json": {
+                "document_type": "JD",
+                "summary": "Backend engineer for payments",
+                "skills": ["Python", "SQL"],
+                "responsibilities": ["Build APIs"],
+                "certifications": [],
+            },
+            "resume.json": {
+                "document_type": "Resume",
+                "experience_years": 5,
+                "summary": "Payments engineer",
+                "skills": ["Python", "Go"],
+                "responsibilities": ["Built APIs", "Ran on-call"],
+                "certifications": ["AWS"],
+            },
+        }
+        paths = []
+        for name, document in documents.items():
+            path = os.path.join(input_dir, name)
+            with open(path, "w") as f:
+                json.dump(document, f)
+            paths.append(path)
+
+        original_encode_unique = pipeline_module._encode_unique
+        pipeline_module._encode_unique = fake_encode_unique
+        try:
+            cold = VectorEmbeddingConversionPipeline().convertJsontoVector(paths, None)
+            assert len(encode_calls) == 1
+            assert len(cold) == 1
+            print("✓ Cold run encodes once and scores the JD/resume pair")
+
+            warm = VectorEmbeddingConversionPipeline().convertJsontoVector(paths, None)
+            assert len(encode_calls) == 1
+            assert warm == cold
+            print("✓ Warm run makes zero encode calls and reproduces the report")
+        finally:
+            pipeline_module._encode_unique = original_encode_unique
+
+    print("\n✅ All vector cache tests passed!")
+    return True
+
+
+def test_vector_file_round_trip():
+    """Test writing and reloading a .vector.json/.npz pair."""
+    print("\n" + "="*60)
+    print("TEST 7: Vector File Round Trip")
+    print("="*60)
+
+    import os
+    import tempfile
+    import numpy as np
+    from vector_embedding_conversion_pipeline import (
+        EMBEDDING_MODEL_NAME,
+        STORAGE_DTYPE,
+        _write_vector_file,
+        load_vector_file,
+    )
+
+    embeddings = {
+        "summary": _fake_embeddings(["summary"]),
+        "skills": _fake_embeddings(["Python", "SQL", "Go"]),
+        "certifications": np.empty((0, 32), dtype=np.float32),
+    }
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        vector_path = os.path.join(tmp_dir, "doc.json.vector.json")
+        _write_vector_file({
+            "vector_path": vector_path,
+            "npz_path": os.path.join(tmp_dir, "doc.json.vector.npz"),
+            "vectors": {
+                "embedding_model": EMBEDDING_MODEL_NAME,
+                "checksum": "abc",
+                "normalized": True,
+                "document_type": "jd",
+                "embeddings": embeddings,
+            },
+        })
+        assert sorted(os.listdir(tmp_dir)) == ["doc.json.vector.json", "doc.json.vector.npz"]
+        loaded = load_vector_file(vector_path)
+
+    assert loaded["checksum"] == "abc"
+    assert loaded["document_type"] == "jd"
+    for field, vectors in embeddings.items():
+        assert loaded["embeddings"][field].dtype == np.float32
+        assert loaded["embeddings"][field].shape == vectors.shape
+        assert np.array_equal(
+            loaded["embeddings"][field], vectors.astype(STORAGE_DTYPE).astype(np.float32)
+        )
+    print("✓ load_vector_file restores float32 embeddings of the stored precision")
+
+    print("\n✅ All vector file tests passed!")
+    return True
+
+
+def test_similarity():
+    """Test the coverage score and summary similarity."""
+    print("\n" + "="*60)
+    print("TEST 8: Similarity")
+    print("="*60)
+
+    import numpy as np
+    import vector_similarity_extractor as similarity_module
+    from vector_similarity_extractor import VectorSimilarityExtractor
+
+    jd_matrix = _fake_embeddings([f"jd {i}" for i in range(5)])
+    resume_matrix = _fake_embeddings([f"resume {i}" for i in range(7)])
+    expected = float((jd_matrix @ resume_matrix.T).max(axis=1).mean())
+
+    small = VectorSimilarityExtractor.coverage_score(jd_matrix, resume_matrix)
+    original_max_ops = similarity_module.SMALL_COVERAGE_MAX_OPS
+    similarity_module.SMALL_COVERAGE_MAX_OPS = 0
+    try:
+        large = VectorSimilarityExtractor.coverage_score(jd_matrix, resume_matrix)
+    finally:
+        similarity_module.SMALL_COVERAGE_MAX_OPS = original_max_ops
+    assert abs(small - expected) < 1e-5
+    assert abs(large - expected) < 1e-5
+    print(f"✓ coverage_score agrees across paths (numba: {similarity_module.njit is not None})")
+
+    # Mismatched widths must fail on every path instead of reading out of bounds
+    for max_ops in (original_max_ops, 0):
+        similarity_module.SMALL_COVERAGE_MAX_OPS = max_ops
+        try:
+            VectorSimilarityExtractor.coverage_score(jd_matrix, resume_matrix[:, :16])
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("coverage_score accepted matrices of different widths")
+        finally:
+            similarity_module.SMALL_COVERAGE_MAX_OPS = original_max_ops
+    print("✓ coverage_score rejects mismatched embedding dimensions")
+
+    # A flat summary vector is one row, not dim one-element rows
+    report = VectorSimilarityExtractor().compute_similarity(
+        {"embeddings": {"summary": [0.1, 0.9, 0.3]}},
+        {"embeddings": {"summary": [0.9, 0.1, -0.2]}},
+    )
+    assert abs(report["summary"] - 13.5647) < 1e-3
+    print("✓ Flat summary vectors score as single rows")
+
+    print("\n✅ All similarity tests passed!")
+    return True
+
+
+def test_long_text_pooling():
+    """Test that texts over the token limit become one pooled vector."""
+    print("\n" + "="*60)
+    print("TEST 9: Long Text Pooling")
+    print("="*60)
+
+    import numpy as np
+    import vector_embedding_conversion_pipeline as pipeline_module
+    from vector_embedding_conversion_pipeline import _mean_pool_chunks, _split_long_text
+
+    class FakeTokenizer:
+        def __init__(self):
+            self.tokens = 0
+
+        def tokenize(self, text):
+            words = text.split()
+            self.tokens += len(words)
+            return words
+
+    long_text = ". ".join(f"Sentence {i} about distributed systems work" for i in range(300))
+
+    # Splitting tokenizes each sentence once, not the whole growing chunk
+    tokenizer = FakeTokenizer()
+    chunks = _split_long_text(long_text, tokenizer, max_tokens=256)
+    assert len(chunks) > 1
+    assert ". ".join(chunks) == long_text
+    assert all(len(chunk.split()) <= 256 for chunk in chunks)
+    assert tokenizer.tokens <= 2 * len(long_text.split())
+    print(f"✓ Long text split into {len(chunks)} chunks with linear tokenizer work")
+
+    # Short strings skip tokenizing only when even one token per byte fits
+    tokenizer = FakeTokenizer()
+    _split_long_text("短" * 100, tokenizer, max_tokens=256)
+    assert tokenizer.tokens > 0
+    print("✓ Multi-byte text is always measured in tokens")
+
+    pooled = _mean_pool_chunks(_fake_embeddings(chunks), [0] * len(chunks), 1)
+    assert pooled.shape == (1, 32)
+    assert abs(float(np.linalg.norm(pooled[0])) - 1.0) < 1e-5
+    print("✓ Chunk vectors pool into one unit vector")
+
+    try:
+        import torch  # noqa: F401
+    except ImportError:
+        print("⚠️  torch is not installed, skipping the end-to-end encode check")
+        print("\n✅ All long text pooling tests passed!")
+        return True
+
+    class FakeModel:
+        tokenizer = FakeTokenizer()
+
+        def __init__(self):
+            self.encoded = []
+
+        def encode(self, sentences, **kwargs):
+            self.encoded.extend(sentences)
+            return _fake_embeddings(sentences)
+
+    model = FakeModel()
+    model_name = pipeline_module.EMBEDDING_MODEL_NAME
+    original_model = pipeline_module._MODEL_CACHE.get(model_name)
+    pipeline_module._MODEL_CACHE[model_name] = model
+    try:
+        vectors = pipeline_module._encode_texts([long_text, "Python"])
+    finally:
+        if original_model is None:
+            pipeline_module._MODEL_CACHE.pop(model_name, None)
+        else:
+            pipeline_module._MODEL_CACHE[model_name] = original_model
+
+    assert len(model.encoded) > 2
+    assert vectors.shape == (2, 32)
+    assert abs(float(np.linalg.norm(vectors[0])) - 1.0) < 1e-2
+    print("✓ _encode_texts pools a long text into one unit vector")
+
+    print("\n✅ All long text pooling tests passed!")
+    return True
+
+
+def test_embedding_cache():
+    """Test that the per-text embedding cache only encodes new strings."""
+    print("\n" + "="*60)
+    print("TEST 10: Embedding Cache")
+    print("="*60)
+
+    import json
+    import os
+    import tempfile
+    import vector_embedding_conversion_pipeline as pipeline_module
+    from vector_embedding_conversion_pipeline import VectorEmbeddingConversionPipeline
+
+    encode_calls = []
+
+    def fake_encode_unique(texts):
+        encode_calls.append(list(texts))
+        return _fake_embeddings(texts)
+
+    jd = {
+        "document_type": "jd",
+        "summary": "Backend engineer for payments",
+        "skills": ["Python", "SQL"],
+        "responsibilities": ["Build APIs"],
+    }
+    resume = {
+        "document_type": "resume",
+        "summary": "Payments engineer",
+        "skills": ["Python", "Go"],
+        "responsibilities": ["Built APIs"],
+    }
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        input_dir = os.path.join(tmp_dir, "input")
+        os.makedirs(input_dir)
+        jd_path = os.path.join(input_dir, "jd.json")
+        resume_path = os.path.join(input_dir, "resume.json")
+        with open(jd_path, "w") as f:
+            json.dump(jd, f)
+        with open(resume_path, "w") as f:
+            json.dump(resume, f)
+
+        original_encode_unique = pipeline_module._encode_unique
+        pipeline_module._encode_unique = fake_encode_unique
+        try:
+            VectorEmbeddingConversionPipeline().convertJsontoVector([jd_path, resume_path], None)
+            assert len(encode_calls) == 1
+
+            # Changing one input defeats its checksum; only its new strings are encoded
+            resume["skills"].append("Rust")
+            resume["summary"] = "Payments and platform engineer"
+            with open(resume_path, "w") as f:
+                json.dump(resume, f)
+            VectorEmbeddingConversionPipeline().convertJsontoVector([jd_path, resume_path], None)
+        finally:
+            pipeline_module._encode_unique = original_encode_unique
+
+    assert len(encode_calls) == 2
+    assert sorted(encode_calls[1]) == ["Payments and platform engineer", "Rust"]
+    print("✓ Edited input only sends its new strings to the encoder")
+
+    # Fresh vectors are rounded to the storage dtype, so a cache hit is bit-identical
+    import numpy as np
+    from vector_embedding_conversion_pipeline import EmbeddingCache, _encode_texts
+
+    texts = ["Python", "Kubernetes operators", "Python"]
+    pipeline_module._encode_unique = fake_encode_unique
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with EmbeddingCache(os.path.join(tmp_dir, "cache.sqlite3")) as cache:
+                fresh = _encode_texts(texts, cache)
+                reloaded = _encode_texts(texts, cache)
+    finally:
+        pipeline_module._encode_unique = original_encode_unique
+    assert len(encode_calls) == 3
+    assert fresh.dtype == reloaded.dtype == np.float32
+    assert np.array_equal(fresh, reloaded)
+    print("✓ Cache misses and hits return identical vectors")
+
+    print("\n✅ All embedding cache tests passed!")
+    return True
+
+
 def run_all_tests():
     """Run all tests."""
     print("\n" + "="*70)
@@ -202,6 +552,11 @@ def run_all_tests():
         ("Ollama Connection", test_ollama_connection),
         ("JSON Validation", test_json_validation),
         ("Integration", test_integration),
+        ("Vector Cache", test_vector_cache),
+        ("Vector File Round Trip", test_vector_file_round_trip),
+        ("Similarity", test_similarity),
+        ("Long Text Pooling", test_long_text_pooling),
+        ("Embedding Cache", test_embedding_cache),
     ]
 
     passed = 0
@@ -235,7 +590,7 @@ def run_all_tests():
         print("\n⚠️  Some tests failed. Please check the errors above.")
         return False
     elif skipped > 0:
-        print("\n⚠️  Some tests were skipped (Ollama not running).")
+        print("\n⚠️  Some tests were skipped (Ollama not running or torch not installed).")
         print("To run all tests:")
         print("  1. Start Ollama: ollama serve")
         print("  2. Pull a model: ollama pull llama3.1:8b")
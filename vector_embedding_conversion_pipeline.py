@@ -1,74 +1,473 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import ijson
+import numpy as np
+import orjson
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL_NAME = 'Qwen/Qwen3-Embedding-0.6B'
+
+# Token limit per encoded string; longer texts are split and mean-pooled
+MAX_SEQ_LENGTH = 256
+
+# Sentences per forward pass of the single batched encode; raise on large GPUs
+EMBEDDING_BATCH_SIZE = int(os.environ.get("EMBEDDING_BATCH_SIZE", "64"))
+
+# Fields copied as-is into the vector metadata, and fields that get embedded
+METADATA_FIELDS = ["document_type", "experience_years"]
+EMBEDDING_FIELDS = ["summary", "skills", "responsibilities", "certifications"]
+
+# Inputs at least this large are stream-parsed so unused fields are never
+# held in memory as a whole document; smaller ones are faster with orjson.
+STREAMING_PARSE_MIN_BYTES = 32 * 1024
+
+# Upper bound on threads used to overlap per-file disk reads and writes
+MAX_IO_WORKERS = 32
+
+# Block size used when hashing input files without reading them whole
+CHECKSUM_BLOCK_SIZE = 1024 * 1024
+
+# Vectors are stored in a compressed .npz sidecar at half precision; cosine
+# similarity is insensitive to the fp16 rounding.
+STORAGE_DTYPE = np.float16
+
+
+# Opt-in torch.compile of the transformer; slow first batches, faster after
+TORCH_COMPILE = os.environ.get("EMBEDDING_TORCH_COMPILE") == "1"
+
+# Process-wide model instances, shared by every pipeline and thread
+_MODEL_CACHE = {}
+_MODEL_LOCK = threading.Lock()
+
+
+def _load_model(model_name):
+    import torch
+    from sentence_transformers import SentenceTransformer
+    use_cuda = torch.cuda.is_available()
+    model = SentenceTransformer(
+        model_name,
+        device='cuda' if use_cuda else 'cpu'
+    )
+    if use_cuda:
+        # Half precision halves memory bandwidth and uses tensor cores
+        model.half()
+    else:
+        # Use every core for CPU inference
+        torch.set_num_threads(os.cpu_count() or 1)
+    if TORCH_COMPILE:
+        transformer = model._first_module()
+        transformer.auto_model = torch.compile(transformer.auto_model, mode="reduce-overhead")
+    # Cap sequence length to bound tokenizer and attention cost on long fields
+    model.max_seq_length = MAX_SEQ_LENGTH
+    return model
+
+
+def _get_model(model_name=EMBEDDING_MODEL_NAME):
+    """Load the embedding model once per process and reuse it across calls."""
+    with _MODEL_LOCK:
+        model = _MODEL_CACHE.get(model_name)
+        if model is None:
+            model = _load_model(model_name)
+            _MODEL_CACHE[model_name] = model
+        return model
+
+
+def _split_long_text(text, tokenizer, max_tokens=MAX_SEQ_LENGTH):
+    """Split text longer than the model's sequence length into sentence chunks."""
+    # Byte-level BPE emits at most one token per UTF-8 byte, so strings this
+    # short cannot reach the limit and need no tokenizing
+    if len(text.encode('utf-8')) <= max_tokens // 2 or len(tokenizer.tokenize(text)) <= max_tokens:
+        return [text]
+
+    # Tokenize each sentence once and keep a running count per chunk; the
+    # ". " separator is counted as one token
+    chunks = []
+    current = []
+    current_tokens = 0
+    for sentence in text.split(". "):
+        sentence_tokens = len(tokenizer.tokenize(sentence))
+        if current and current_tokens + 1 + sentence_tokens > max_tokens:
+            chunks.append(". ".join(current))
+            current = []
+            current_tokens = 0
+        current_tokens += sentence_tokens + (1 if current else 0)
+        current.append(sentence)
+    if current:
+        chunks.append(". ".join(current))
+    return chunks
+
+
+class EmbeddingCache:
+    """
+    Persistent text -> embedding cache backed by SQLite.
+
+    Keys are sha256(model name + NUL + text), so a model change never reuses
+    stale vectors; values are STORAGE_DTYPE vector bytes.
+    """
+
+    # Stay under SQLite's default limit on bound parameters per statement
+    _QUERY_CHUNK = 500
+
+    def __init__(self, path, model_name=EMBEDDING_MODEL_NAME):
+        self.model_name = model_name
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _key(self, text):
+        return hashlib.sha256(f"{self.model_name}\x00{text}".encode('utf-8')).digest()
+
+    def get_many(self, texts):
+        """Return a float32 vector for each text, or None where it is not cached."""
+        keys = [self._key(text) for text in texts]
+        found = {}
+        for start in range(0, len(keys), self._QUERY_CHUNK):
+            batch = keys[start:start + self._QUERY_CHUNK]
+            placeholders = ",".join("?" * len(batch))
+            found.update(self._conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+            ))
+        return [
+            np.frombuffer(found[key], dtype=STORAGE_DTYPE).astype(np.float32) if key in found else None
+            for key in keys
+        ]
+
+    def put_many(self, texts, vectors):
+        """Store one vector per text."""
+        rows = [
+            (self._key(text), vector.astype(STORAGE_DTYPE).tobytes())
+            for text, vector in zip(texts, vectors)
+        ]
+        with self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?)", rows)
+
+    def close(self):
+        self._conn.close()
+
+
+def _encode_unique(texts):
+    """Encode distinct texts into an L2-normalized (len(texts), dim) float32 matrix."""
+    import torch
+    model = _get_model()
+
+    # Texts over the token limit would be truncated; encode their sentence
+    # chunks instead and pool them back into one vector per text.
+    chunks = []
+    owners = []
+    for owner, text in enumerate(texts):
+        for chunk in _split_long_text(text, model.tokenizer):
+            chunks.append(chunk)
+            owners.append(owner)
+
+    # Sort globally by length so each batch pads to a similar length, then
+    # scatter the results back to the original order
+    order = np.argsort([len(chunk) for chunk in chunks], kind='stable')
+    with torch.inference_mode():
+        sorted_vectors = model.encode(
+            [chunks[i] for i in order],
+            batch_size=EMBEDDING_BATCH_SIZE,
+            show_progress_bar=False,
+            convert_to_numpy=True,
+            normalize_embeddings=True
+        )
+    # fp16 models return half-precision arrays; similarity math runs in float32
+    chunk_vectors = np.empty(sorted_vectors.shape, dtype=np.float32)
+    chunk_vectors[order] = sorted_vectors
+    if len(chunks) == len(texts):
+        return chunk_vectors
+    return _mean_pool_chunks(chunk_vectors, owners, len(texts))
+
+
+def _mean_pool_chunks(chunk_vectors, owners, count):
+    """Pool chunk vectors into one L2-normalized row per owning text."""
+    # The sum has the same direction as the mean and is renormalized anyway
+    vectors = np.zeros((count, chunk_vectors.shape[1]), dtype=np.float32)
+    np.add.at(vectors, owners, chunk_vectors)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-8
+    return vectors
+
+
+def _encode_texts(texts, cache=None):
+    """Encode texts into an L2-normalized (len(texts), dim) float32 matrix."""
+    # Skills and responsibilities repeat across documents: encode each
+    # distinct string once, then gather rows back per occurrence.
+    unique_index = {}
+    positions = [unique_index.setdefault(text, len(unique_index)) for text in texts]
+    unique_texts = list(unique_index)
+
+    # Only strings never seen before (for this model) reach the encoder
+    if cache is not None:
+        unique_vectors = cache.get_many(unique_texts)
+    else:
+        unique_vectors = [None] * len(unique_texts)
+    missing = [i for i, vector in enumerate(unique_vectors) if vector is None]
+    if missing:
+        missing_texts = [unique_texts[i] for i in missing]
+        # Round through the storage dtype so fresh vectors score exactly like
+        # ones reloaded from the cache or a .npz on a later run
+        encoded = _encode_unique(missing_texts).astype(STORAGE_DTYPE).astype(np.float32)
+        if cache is not None:
+            cache.put_many(missing_texts, encoded)
+        for i, vector in zip(missing, encoded):
+            unique_vectors[i] = vector
+    logger.debug("Encoded %d of %d distinct texts", len(missing), len(unique_texts))
+
+    return np.stack(unique_vectors)[positions]
+
+
+class _HashingReader:
+    """File wrapper that feeds every byte read into a running digest."""
+
+    def __init__(self, f, digest):
+        self._f = f
+        self._digest = digest
+
+    def read(self, size=-1):
+        data = self._f.read(size)
+        self._digest.update(data)
+        return data
+
+
+def _prepare_input(path, vector_output_dir):
+    """
+    Read, hash and parse one input file in a single pass.
+
+    Returns (checksum, cached, data, error, out_path, npz_path). cached holds
+    reusable vectors when the input is unchanged; otherwise data is the
+    parsed document, or error the exception that stopped parsing it.
+    """
+    base_name = os.path.basename(str(path))
+    out_path = os.path.join(vector_output_dir, base_name + ".vector.json")
+    npz_path = os.path.join(vector_output_dir, base_name + ".vector.npz")
+    data = error = None
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < STREAMING_PARSE_MIN_BYTES:
+            content = f.read()
+            checksum = _compute_checksum(content)
+            try:
+                data = orjson.loads(content)
+            except Exception as e:
+                error = e
+        else:
+            # Stream large inputs so unused fields are never held whole,
+            # hashing exactly the bytes the parser consumes
+            digest = hashlib.sha256()
+            reader = _HashingReader(f, digest)
+            wanted = set(METADATA_FIELDS) | set(EMBEDDING_FIELDS)
+            try:
+                data = {
+                    key: value
+                    for key, value in ijson.kvitems(reader, '', use_float=True)
+                    if key in wanted
+                }
+            except Exception as e:
+                error = e
+            # Hash any trailing bytes the parser did not need
+            while reader.read(CHECKSUM_BLOCK_SIZE):
+                pass
+            checksum = digest.hexdigest()
+    cached = _load_cached_vectors(out_path, checksum)
+    if cached is not None:
+        data = error = None
+    return checksum, cached, data, error, out_path, npz_path
+
+
+def _write_vector_file(vector_file):
+    # Small JSON metadata file next to a binary .npz holding the embeddings
+    output = vector_file["vectors"]
+    metadata = {key: value for key, value in output.items() if key != "embeddings"}
+    metadata["embeddings_file"] = os.path.basename(vector_file["npz_path"])
+    metadata["embeddings_dtype"] = np.dtype(STORAGE_DTYPE).name
+    # The metadata's checksum marks a finished write: drop the old one first,
+    # write the embeddings, and only then publish the new metadata, so a
+    # crash in between can never pair a matching checksum with stale vectors.
+    vector_path = vector_file["vector_path"]
+    if os.path.exists(vector_path):
+        os.remove(vector_path)
+    npz_tmp = vector_file["npz_path"] + ".tmp"
+    with open(npz_tmp, 'wb') as f:
+        np.savez_compressed(
+            f, **{field: vecs.astype(STORAGE_DTYPE) for field, vecs in output["embeddings"].items()}
+        )
+    os.replace(npz_tmp, vector_file["npz_path"])
+    json_tmp = vector_path + ".tmp"
+    with open(json_tmp, 'wb') as f:
+        f.write(orjson.dumps(metadata, option=orjson.OPT_INDENT_2))
+    os.replace(json_tmp, vector_path)
+
+
+def _compute_checksum(content):
+    """Checksum of a file's raw bytes, used to detect unchanged inputs."""
+    # SHA-256 runs on the CPU's SHA extensions through OpenSSL, unlike MD5
+    return hashlib.sha256(content).hexdigest()
+
+
+def _load_cached_vectors(vector_path, checksum):
+    """Return previously written vectors if they were built from identical input."""
+    if not os.path.exists(vector_path):
+        return None
+    try:
+        with open(vector_path, 'rb') as f:
+            metadata = orjson.loads(f.read())
+        if (metadata.get("checksum") != checksum
+                or metadata.get("embedding_model") != EMBEDDING_MODEL_NAME):
+            return None
+        return load_vector_file(vector_path)
+    except Exception as e:
+        logger.warning("Ignoring unreadable cached vectors %s: %s", vector_path, e)
+        return None
+
+
+def load_vector_file(vector_path):
+    """
+    Load a .vector.json metadata file and its .npz embeddings.
+
+    Returns the same structure convertJsontoVector keeps in memory, with
+    each field's embeddings as a float32 (n, dim) array.
+    """
+    with open(vector_path, 'rb') as f:
+        metadata = orjson.loads(f.read())
+    npz_path = os.path.join(os.path.dirname(vector_path), metadata.pop("embeddings_file"))
+    metadata.pop("embeddings_dtype", None)
+    with np.load(npz_path) as archive:
+        metadata["embeddings"] = {
+            field: archive[field].astype(np.float32) for field in archive.files
+        }
+    return metadata
+
+
 class VectorEmbeddingConversionPipeline:
     def convertJsontoVector(self, file_path, param2):
-        print("Converting JSON to vector with input:", file_path, "and param2:", param2)
-        import json
-        from sentence_transformers import SentenceTransformer
-        import os
-        model = SentenceTransformer('Qwen/Qwen3-Embedding-0.6B')
-        file_contents = []
-        for path in file_path:
-            with open(path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                file_contents.append(content)
-        print("Loaded file contents:", file_contents)
-
+        logger.debug("Converting JSON to vector with input: %s and param2: %s", file_path, param2)
+        if not file_path:
+            logger.warning("No files to convert")
+            return []
         vector_output_dir = os.path.join(os.path.dirname(file_path[0]), "../vector_output")
         os.makedirs(vector_output_dir, exist_ok=True)
-        for idx, content in enumerate(file_contents):
-            try:
-                data = json.loads(content)
-            except Exception as e:
-                print(f"Error loading JSON from file {file_path[idx]}: {e}")
+
+        # Disk reads and hashing release the GIL, so read, hash and parse
+        # each file in the pool to overlap them across files
+        io_workers = min(MAX_IO_WORKERS, len(file_path))
+        with ThreadPoolExecutor(max_workers=io_workers) as executor:
+            prepared = list(executor.map(
+                lambda path: _prepare_input(path, vector_output_dir), file_path
+            ))
+        logger.debug("Loaded %d files", len(prepared))
+
+        # Parse every file first and collect all strings to embed, so the model
+        # is called once for the whole batch instead of once per field per file.
+        texts = []
+        documents = []
+        for idx, (checksum, cached, data, error, out_path, npz_path) in enumerate(prepared):
+            # Reuse vectors from a previous run when the input is unchanged
+            if cached is not None:
+                logger.info("Reusing cached vectors for %s", file_path[idx])
+                documents.append((idx, cached, None, out_path, npz_path))
+                continue
+
+            if error is not None:
+                logger.error("Error loading JSON from file %s: %s", file_path[idx], error)
                 continue
 
             # Prepare output structure
-            output = {}
+            # Vectors are L2-normalized at encode time, so cosine similarity is a dot product
+            output = {"embedding_model": EMBEDDING_MODEL_NAME, "checksum": checksum, "normalized": True}
             # Copy metadata fields as-is (not embedded)
-            for meta_field in ["document_type", "experience_years"]:
+            for meta_field in METADATA_FIELDS:
                 if meta_field in data:
                     output[meta_field] = data[meta_field]
                 else:
                     output[meta_field] = None
 
-            # Embedding fields
-            embedding_fields = ["summary", "skills", "responsibilities", "certifications"]
-            embeddings = {}
-            for field in embedding_fields:
+            # Record where each field's strings live in the flat text list
+            spans = {}
+            for field in EMBEDDING_FIELDS:
                 value = data.get(field)
                 if value is None:
-                    embeddings[field] = []
+                    values = []
                 elif isinstance(value, list):
-                    if value:
-                        vectors = model.encode([str(v) for v in value])
-                        embeddings[field] = [vec.tolist() for vec in vectors]
-                    else:
-                        embeddings[field] = []
+                    values = [str(v) for v in value]
                 else:
-                    vec = model.encode(str(value)).tolist()
-                    embeddings[field] = [vec]
+                    values = [str(value)]
+                spans[field] = (len(texts), len(values))
+                texts.extend(values)
+            documents.append((idx, output, spans, out_path, npz_path))
+
+        if texts:
+            cache_path = os.environ.get("EMBEDDING_CACHE_PATH") or os.path.join(
+                vector_output_dir, "embedding_cache.sqlite3"
+            )
+            with EmbeddingCache(cache_path) as cache:
+                vectors = _encode_texts(texts, cache)
+        else:
+            vectors = np.empty((0, 0), dtype=np.float32)
+
+        vector_files = []
+        new_vector_files = []
+        for idx, output, spans, out_path, npz_path in documents:
+            vector_file = {
+                "original_path": str(file_path[idx]),
+                "vector_path": out_path,
+                "npz_path": npz_path,
+                "vectors": output,
+            }
+            vector_files.append(vector_file)
+            if spans is None:
+                # Loaded from cache, nothing to slice or write
+                continue
+
+            # Slice each field's (n, dim) block back out of the batch result
+            embeddings = {
+                field: vectors[start:start + count]
+                for field, (start, count) in spans.items()
+            }
             output["embeddings"] = embeddings
 
             # Ensure all embeddings have the same dimension
-            dims = [len(vec[0]) for vec in embeddings.values() if vec]
+            dims = [vec.shape[1] for vec in embeddings.values() if len(vec)]
             if dims and not all(d == dims[0] for d in dims):
-                print(f"Warning: Not all embeddings have the same dimension in file {file_path[idx]}")
+                logger.warning("Not all embeddings have the same dimension in file %s", file_path[idx])
+            new_vector_files.append(vector_file)
 
-            base_name = os.path.basename(str(file_path[idx]))
-            out_path = os.path.join(vector_output_dir, base_name + ".vector.json")
-            with open(out_path, 'w', encoding='utf-8') as f:
-                json.dump(output, f, indent=2, ensure_ascii=False)
-            print(f"Vector embedding output written to: {out_path}")
+        # Embedding stays on the main thread; only the file writes are parallel
+        if new_vector_files:
+            with ThreadPoolExecutor(max_workers=io_workers) as executor:
+                list(executor.map(_write_vector_file, new_vector_files))
+        for vector_file in new_vector_files:
+            logger.info("Vector embedding output written to: %s", vector_file['vector_path'])
 
-        # After all files processed, call VectorSimilarityExtractor.compute_similarity with the two files' contents
+        # Score every JD against every resume using the vectors already in memory
         from vector_similarity_extractor import VectorSimilarityExtractor
-        file2 = "/Users/poojamanikandan/ai-feature-extraction/output/../vector_output/Rajesh_Kummara-NetworkL3-SME-11yrs-BLR.docx.json.vector.json"
-        file1 = "/Users/poojamanikandan/ai-feature-extraction/output/../vector_output/Sr_Network_Engineer_(US049I_E).json.vector.json"
-        try:
-            with open(file1, 'r', encoding='utf-8') as f1, open(file2, 'r', encoding='utf-8') as f2:
-                content1 = f1.read()
-                content2 = f2.read()
-        except Exception as e:
-            print(f"Error reading vector files for similarity: {e}")
-            return
+        # The LLM's document_type is only stripped upstream, so "JD" or "Resume" can appear
+        def doc_type(vector_file):
+            return str(vector_file["vectors"].get("document_type") or "").strip().lower()
+        jds = [v for v in vector_files if doc_type(v) == "jd"]
+        resumes = [v for v in vector_files if doc_type(v) == "resume"]
+        if not jds or not resumes:
+            logger.warning("Skipping similarity: need at least one JD and one resume")
+            return []
+
         similarity_extractor = VectorSimilarityExtractor()
-        similarity_extractor.compute_similarity(content1, content2)
\ No newline at end of file
+        results = []
+        for jd in jds:
+            for resume in resumes:
+                report = similarity_extractor.compute_similarity(jd["vectors"], resume["vectors"])
+                results.append({
+                    "jd": jd["original_path"],
+                    "resume": resume["original_path"],
+                    "similarity": report,
+                })
+        return results
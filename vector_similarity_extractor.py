@@ -1,17 +1,102 @@
-import json
+import logging
+import os
 import numpy as np
+import orjson
 from numpy.linalg import norm
 
+from vector_embedding_conversion_pipeline import load_vector_file
+
+# Optional JIT for the small-matrix coverage score, with a NumPy fallback
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+logger = logging.getLogger(__name__)
+
+# Below this many multiply-adds (n_jd * n_resume * dim) a fused JIT loop
+# beats allocating the similarity matrix for a GEMM.
+SMALL_COVERAGE_MAX_OPS = 200_000
+
+
+if njit is not None:
+    @njit(fastmath=True, cache=True)
+    def _coverage_njit(jd_matrix, resume_matrix):
+        n, dim = jd_matrix.shape
+        m = resume_matrix.shape[0]
+        total = 0.0
+        for i in range(n):
+            best = -1.0
+            for j in range(m):
+                dot = 0.0
+                for k in range(dim):
+                    dot += jd_matrix[i, k] * resume_matrix[j, k]
+                if dot > best:
+                    best = dot
+            total += best
+        return total / n
+else:
+    _coverage_njit = None
+
 
 class VectorSimilarityExtractor:
+    @staticmethod
+    def _as_unit_matrix(vectors, normalized):
+        """Stack a field's vectors into a float32 (n, dim) matrix with unit-length rows."""
+        matrix = np.asarray(vectors, dtype=np.float32)
+        # A flat (dim,) vector is a single row, not dim one-element rows
+        matrix = matrix.reshape(-1, matrix.shape[-1])
+        if not normalized:
+            matrix = matrix / (norm(matrix, axis=1, keepdims=True) + 1e-8)
+        return matrix
+
+    @staticmethod
+    def coverage_score(jd_matrix, resume_matrix):
+        """
+        Mean over JD items of the best cosine match among resume items.
+
+        Both inputs are unit-row float32 matrices, so one matrix product
+        yields every JD item x resume item cosine. Small inputs use a fused
+        Numba loop when numba is installed.
+        """
+        # The JIT loop runs without bounds checks, so mismatched widths must
+        # be rejected here rather than read past the resume buffer
+        if jd_matrix.shape[1] != resume_matrix.shape[1]:
+            raise ValueError(
+                f"Embedding dimensions differ: {jd_matrix.shape[1]} vs {resume_matrix.shape[1]}"
+            )
+        if (_coverage_njit is not None
+                and jd_matrix.size * len(resume_matrix) < SMALL_COVERAGE_MAX_OPS):
+            return float(_coverage_njit(jd_matrix, resume_matrix))
+        return float((jd_matrix @ resume_matrix.T).max(axis=1).mean())
+
+    @staticmethod
+    def _load(vector):
+        """Accept an in-memory dict, a JSON string, or a .vector.json path with its .npz."""
+        if isinstance(vector, os.PathLike):
+            return load_vector_file(vector)
+        if isinstance(vector, str):
+            if vector.lstrip().startswith("{"):
+                return orjson.loads(vector)
+            return load_vector_file(vector)
+        return vector
+
     def compute_similarity(self, vector1, vector2):
-        print("Computing similarity between:", vector1, "and", vector2)
+        # Never format the vectors themselves; they can be megabytes of floats
+        logger.debug("Computing similarity between two vector documents")
+
+        vector1 = self._load(vector1)
+        vector2 = self._load(vector2)
 
-        # Parse JSON if passed as string
-        if isinstance(vector1, str):
-            vector1 = json.loads(vector1)
-        if isinstance(vector2, str):
-            vector2 = json.loads(vector2)
+        # Vectors from different models live in unrelated spaces
+        model1 = vector1.get("embedding_model")
+        model2 = vector2.get("embedding_model")
+        if model1 and model2 and model1 != model2:
+            raise ValueError(f"Cannot compare embeddings from {model1} and {model2}")
+
+        # Vectors written by the embedding pipeline are already L2-normalized
+        normalized1 = vector1.get("normalized", False)
+        normalized2 = vector2.get("normalized", False)
 
         emb1 = vector1.get("embeddings", {})
         emb2 = vector2.get("embeddings", {})
@@ -22,48 +107,36 @@ class VectorSimilarityExtractor:
             v1 = emb1.get(key, [])
             v2 = emb2.get(key, [])
 
-            if not v1 or not v2:
+            # Inputs may be lists (parsed JSON) or ndarrays (in-memory vectors)
+            if len(v1) == 0 or len(v2) == 0:
                 similarity_report[key] = 0.0
                 continue
 
+            # Unit-length rows make every cosine a plain dot product
+            mat1 = self._as_unit_matrix(v1, normalized1)
+            mat2 = self._as_unit_matrix(v2, normalized2)
+
             # ======================
             # SUMMARY (single vector)
             # ======================
             if key == "summary":
-                vec1 = np.array(v1)
-                vec2 = np.array(v2)
-                # Flatten or squeeze to 1D if needed
-                vec1 = np.squeeze(vec1)
-                vec2 = np.squeeze(vec2)
-                similarity = (
-                    np.dot(vec1, vec2) / (norm(vec1) * norm(vec2) + 1e-8)
-                ) * 100
-                similarity_report[key] = float(similarity)
+                similarity = float(mat1[0] @ mat2[0]) * 100
+                similarity_report[key] = similarity
                 continue
 
             # ====================================
             # LIST FIELDS (coverage-aware cosine)
             # ====================================
-            sims = []
-
-            for vec1 in v1:
-                vec1 = np.array(vec1)
-                vec1 = np.squeeze(vec1)
-                # Best semantic match for each JD item
-                max_sim = max(
-                    np.dot(vec1, np.squeeze(np.array(vec2))) / (norm(vec1) * norm(np.squeeze(np.array(vec2))) + 1e-8)
-                    for vec2 in v2
-                )
-                sims.append(max_sim)
-
             # IMPORTANT CHANGE:
             # Mean of best matches instead of mean of all comparisons
-            similarity = float(np.mean(sims)) * 100
+            similarity = self.coverage_score(mat1, mat2) * 100
             similarity_report[key] = similarity
 
-        print(
-            "Cosine similarity report (coverage-aware, percent):",
-            json.dumps(similarity_report, indent=2)
-        )
+        # Only pay for pretty-printing when the report will actually be logged
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "Cosine similarity report (coverage-aware, percent): %s",
+                orjson.dumps(similarity_report, option=orjson.OPT_INDENT_2).decode('utf-8')
+            )
         return similarity_report
  
\ No newline at end of file